@@ -0,0 +1,44 @@
+"""Text extraction for Atlassian Document Format (ADF) trees.
+
+Kept free of dynamic features so it can be compiled with mypyc
+(``mypyc _adf.py``); the compiled extension shadows this module when present
+and ``jira_client`` picks it up through the same import.
+"""
+
+from __future__ import annotations
+
+from typing import List, Tuple
+
+
+def extract_texts(nodes: List[object]) -> List[str]:
+    """Extract text from several ADF trees in one pass, one text node per line.
+
+    Walks every tree with one explicit stack (pre-order, left to right) so deep
+    documents cannot hit the recursion limit; each stack entry carries the index
+    of the root it came from, and each root's output is joined once.
+    """
+    outs: List[List[str]] = [[] for _ in nodes]
+    stack: List[Tuple[int, object]] = []
+    for idx in range(len(nodes) - 1, -1, -1):
+        stack.append((idx, nodes[idx]))
+    while stack:
+        idx, n = stack.pop()
+        if isinstance(n, dict):
+            if n.get("type") == "text":
+                out = outs[idx]
+                out.append(str(n.get("text", "")))
+                out.append("\n")
+            else:
+                content = n.get("content")
+                if content:
+                    stack.append((idx, content))
+        elif isinstance(n, list):
+            # Push in reverse so the leftmost child is processed first.
+            for i in range(len(n) - 1, -1, -1):
+                stack.append((idx, n[i]))
+    return ["".join(out).rstrip("\n") for out in outs]
+
+
+def extract_text(node: object) -> str:
+    """Extract text from a single ADF tree, one text node per line."""
+    return extract_texts([node])[0]
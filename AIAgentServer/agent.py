@@ -1,52 +1,82 @@
 """BugFixer agent orchestration."""
 import asyncio
+import atexit
+import hashlib
 from web_agent import web_search
-from rag_client import query_jira_rag
-import json
+from rag_client import aquery_jira_rag, warm_reranker
 import logging
 import os
+import queue
 import uuid
-import re
 import unicodedata
+import weakref
+from collections import deque
+from dataclasses import dataclass, field
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 import random
+import orjson
 
-from typing import Any, Dict, List, Optional, AsyncGenerator
-from openai import OpenAI
+from typing import Any, Deque, Dict, List, Optional, AsyncGenerator, Tuple
+from openai import AsyncOpenAI
 
+from cache import TTLCache
 from codex_client import CodexCLIError, CodexClient
 from config import AgentConfig
 from git_client import GitClient
-from jira_client import JiraClient
+from jira_client import JiraClient, close_shared_client
 
 from dotenv import load_dotenv
 
-from prompts import SYSTEM_PROMPT, toolsForBugFix
+from prompts import SYSTEM_PROMPT, TOOLS_JSON, toolsForBugFix
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
-fh = logging.FileHandler("agent.log")
+fh = RotatingFileHandler("agent.log", maxBytes=10_000_000, backupCount=5)
 fh.setLevel(logging.INFO)
 formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
 fh.setFormatter(formatter)
 if not logger.handlers:
-    logger.addHandler(fh)
+    # Records are handed to a background thread so disk writes never block the event loop.
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    logger.addHandler(QueueHandler(log_queue))
+    log_listener = QueueListener(log_queue, fh, respect_handler_level=True)
+    log_listener.start()
+    atexit.register(log_listener.stop)
 
 MAX_ACTION_PREVIEW = 6000
 MAX_PROMPT_CHARS = 500
+# Control characters stripped from user prompts (everything below 0x20 except tab/newline, plus DEL).
+_CTRL_TRANSLATE = dict.fromkeys([*range(0x00, 0x09), 0x0B, 0x0C, *range(0x0E, 0x20), 0x7F])
+# Tokens produced within this window are coalesced into a single websocket frame.
+TOKEN_BATCH_SIZE = 64
+TOKEN_BATCH_DELAY = 0.015
+# Frames buffered per connection before the oldest token frames are dropped for a slow client.
+OUTBOX_SIZE = 512
+MAX_CONVERSATIONS = 1024
+RESPONSE_CACHE_SIZE = 256
+TOOL_CACHE_SIZE = 512
+TOOL_CACHE_TTL = 300.0
+# Tools with side effects on the working tree are always executed.
+UNCACHED_TOOLS = frozenset({"pull_repo", "exec_codex", "batch"})
+# Read-only lookups that may run concurrently (and inside batch); every other tool runs alone, in call order.
+CONCURRENT_TOOLS = frozenset({"fetch_jira", "query_jira_rag", "web_search"})
 
 load_dotenv()
 config = AgentConfig.from_env()
-# logoin codex
 codex_client = CodexClient(config.codex)
-try:
-    codex_client.login_codex()
-    print("Codex CLI logged in successfully.")
-except CodexCLIError as exc:
-    logger.error("Failed to login to Codex CLI: %s", exc)
-    print("Failed to login to Codex CLI. Check logs for details.")
+# One OpenAI client (and httpx connection pool) shared by every agent run; closed on shutdown.
+openai_client = AsyncOpenAI(api_key=config.openai.api_key)
+
+# Shared, never-mutated head of every conversation so the provider can reuse its cached prefix.
+_SYSTEM_MESSAGE = {"role": "system", "content": SYSTEM_PROMPT}
+
+# Model replies keyed by a digest of the full request, shared across conversations.
+_response_cache: TTLCache[Any] = TTLCache(RESPONSE_CACHE_SIZE, ttl=config.openai.response_cache_ttl)
+# Tool results keyed by (tool name, digest of canonical arguments).
+_tool_cache: TTLCache[str] = TTLCache(TOOL_CACHE_SIZE, ttl=TOOL_CACHE_TTL)
 
 app = FastAPI(title="AI Agent Demo Server", version="0.1.0")
 app.add_middleware(
@@ -56,6 +86,35 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+
+
+@app.on_event("startup")
+async def login_codex() -> None:
+    # Codex persists credentials on disk, so this only spawns `codex login` on a fresh machine.
+    try:
+        await codex_client.ensure_login()
+        print("Codex CLI logged in successfully.")
+    except CodexCLIError as exc:
+        logger.error("Failed to login to Codex CLI: %s", exc)
+        print("Failed to login to Codex CLI. Check logs for details.")
+
+
+@app.on_event("startup")
+async def load_reranker() -> None:
+    # Pay the cross-encoder load at boot instead of inside the first RAG tool call.
+    try:
+        await asyncio.to_thread(warm_reranker)
+    except Exception as exc:
+        logger.error("Failed to warm up the RAG reranker: %s", exc)
+
+
+@app.on_event("shutdown")
+async def close_clients() -> None:
+    await codex_client.close()
+    await openai_client.close()
+    await close_shared_client()
+
+
 TOOLNAME_TO_STEP = {
     "fetch_jira": "JiraIntake",
     "pull_repo": "RepoPull",
@@ -67,30 +126,61 @@ TOOLNAME_TO_STEP = {
 class ConversationState:
     def __init__(self) -> None:
         self.active_task: Optional[asyncio.Task] = None
+        # The socket that owns this conversation; a weakref so state never keeps a closed socket alive.
+        self.websocket_ref: Optional[weakref.ref] = None
+
 
+def _is_running(state: ConversationState) -> bool:
+    return state.active_task is not None and not state.active_task.done()
 
-conversations: Dict[str, ConversationState] = {}
+
+def _cancel_evicted_conversation(conversation_id: Any, state: ConversationState) -> None:
+    # An evicted conversation can no longer be reached by a stop request, so don't leave its run going.
+    # Only reached when every cached conversation is running; idle ones are evicted first.
+    if _is_running(state):
+        logger.warning("Conversation %s evicted while running; cancelling it", conversation_id)
+        state.active_task.cancel()
+
+
+# Once MAX_CONVERSATIONS is reached the least-recently-used idle conversation is forgotten; only
+# when every conversation is running does the LRU evict (and cancel) the oldest run.
+conversations: TTLCache[ConversationState] = TTLCache(MAX_CONVERSATIONS, on_evict=_cancel_evicted_conversation)
+
+
+def _evict_idle_conversation() -> None:
+    for conversation_id, state in conversations.items():
+        if not _is_running(state):
+            conversations.pop(conversation_id)
+            return
 
 
-def get_conversation_state(conversation_id: str) -> ConversationState:
+def get_conversation_state(conversation_id: str, websocket: Optional[WebSocket] = None) -> ConversationState:
     state = conversations.get(conversation_id)
     if not state:
         state = ConversationState()
-        conversations[conversation_id] = state
+        if len(conversations) >= MAX_CONVERSATIONS:
+            _evict_idle_conversation()
+        conversations.set(conversation_id, state)
+    if websocket is not None:
+        state.websocket_ref = weakref.ref(websocket)
     return state
 
 
 @app.websocket("/ai-agent")
 async def websocket_endpoint(websocket: WebSocket) -> None:
+    # No TCP_NODELAY tweak needed: asyncio's and uvloop's TCP transports already disable
+    # Nagle on every accepted socket, and ASGI does not expose the raw socket anyway.
     await websocket.accept()
     logger.info("Client connected from %s", websocket.client)
+    outbox = _Outbox(websocket)
+    websocket.state.outbox = outbox
 
     try:
         while True:
             data = await websocket.receive_text()
             try:
-                command = json.loads(data)
-            except json.JSONDecodeError as exc:
+                command = orjson.loads(data)
+            except orjson.JSONDecodeError as exc:
                 logger.warning("Dropping invalid payload: %s", exc)
                 continue
 
@@ -106,7 +196,8 @@ async def websocket_endpoint(websocket: WebSocket) -> None:
     except WebSocketDisconnect:
         logger.info("Client disconnected")
     finally:
-        await cleanup_connection()
+        await cleanup_connection(websocket)
+        outbox.close()
 
 
 async def handle_user_message(websocket: WebSocket, command: dict) -> None:
@@ -117,7 +208,7 @@ async def handle_user_message(websocket: WebSocket, command: dict) -> None:
         logger.warning("Ignoring incomplete user message: %s", command)
         return
 
-    state = get_conversation_state(conversation_id)
+    state = get_conversation_state(conversation_id, websocket)
     if state.active_task and not state.active_task.done():
         logger.info("Conversation %s already streaming. Waiting for completion.", conversation_id)
         return
@@ -133,8 +224,11 @@ async def handle_stop_request(websocket: WebSocket, command: dict) -> None:
     if not conversation_id:
         return
 
-    state = get_conversation_state(conversation_id)
-    if state.active_task and not state.active_task.done():
+    # Look up only: a stop for an unknown id must not create (and evict for) a new conversation.
+    state = conversations.get(conversation_id)
+    if state is None:
+        return
+    if _is_running(state):
         logger.info("Stopping response for conversation %s", conversation_id)
         state.active_task.cancel()
         try:
@@ -198,24 +292,174 @@ async def stream_agent_response(
             state.active_task = None
 
 
+class _Outbox:
+    """Bounded per-connection queue of encoded frames drained by a single writer task.
+
+    Producers never wait on the socket: when a slow client lets the queue fill up,
+    the oldest droppable (response-token) frame is discarded to make room. Control
+    frames (response-start/end/error/...) are never dropped; if nothing droppable is
+    queued they are appended past the bound so the UI always sees a response finish.
+    """
+
+    def __init__(self, websocket: WebSocket, maxsize: int = OUTBOX_SIZE) -> None:
+        self._websocket = websocket
+        self._maxsize = maxsize
+        self._frames: Deque[Tuple[bytes, bool]] = deque()
+        self._ready = asyncio.Event()
+        self._writer = asyncio.create_task(self._drain())
+
+    def put(self, frame: bytes, droppable: bool = False) -> None:
+        if len(self._frames) >= self._maxsize:
+            for index, (_, queued_droppable) in enumerate(self._frames):
+                if queued_droppable:
+                    del self._frames[index]
+                    logger.warning("Outbound queue full for %s; dropped oldest token frame", self._websocket.client)
+                    break
+            else:
+                if droppable:
+                    logger.warning("Outbound queue full for %s; dropped token frame", self._websocket.client)
+                    return
+        self._frames.append((frame, droppable))
+        self._ready.set()
+
+    def close(self) -> None:
+        self._writer.cancel()
+
+    async def _drain(self) -> None:
+        while True:
+            if not self._frames:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+            frame, _ = self._frames.popleft()
+            try:
+                await self._websocket.send_bytes(frame)
+            except Exception as exc:  # pylint: disable=broad-exception-caught
+                logger.info("Stopped writing to %s: %s", self._websocket.client, exc)
+                return
+
+
 async def send_event(websocket: WebSocket, **payload: object) -> None:
-    await websocket.send_text(json.dumps(payload))
+    await send_frame(websocket, orjson.dumps(payload))
+
 
+async def send_frame(websocket: WebSocket, frame: bytes, droppable: bool = False) -> None:
+    """Send an already-encoded JSON event; ``droppable`` frames may be shed under backpressure."""
+    outbox: Optional[_Outbox] = getattr(websocket.state, "outbox", None)
+    if outbox is None:
+        await websocket.send_bytes(frame)
+    else:
+        outbox.put(frame, droppable)
 
-async def cleanup_connection() -> None:
-    for state in conversations.values():
+
+async def cleanup_connection(websocket: WebSocket) -> None:
+    """Cancel and forget the conversations owned by ``websocket`` (or by sockets already collected)."""
+    for conversation_id, state in conversations.items():
+        owner = state.websocket_ref() if state.websocket_ref else None
+        if owner is not None and owner is not websocket:
+            continue
         if state.active_task and not state.active_task.done():
             state.active_task.cancel()
-    conversations.clear()
+        conversations.pop(conversation_id)
     
 class AgentProtocolError(RuntimeError):
     pass
 
+
+@dataclass
+class _ToolCallFunction:
+    name: str = ""
+    arguments: str = ""
+
+
+@dataclass
+class _ToolCall:
+    id: str = ""
+    type: str = "function"
+    function: _ToolCallFunction = field(default_factory=_ToolCallFunction)
+
+
+@dataclass
+class _ModelReply:
+    """Assistant message reassembled from a streamed chat completion."""
+
+    content: Optional[str] = None
+    tool_calls: Optional[List[_ToolCall]] = None
+
+
+class _TokenBatcher:
+    """Coalesce streamed tokens into ``response-token`` frames carrying a ``tokens`` array.
+
+    A single writer task drains the queue and flushes once ``max_tokens`` tokens are
+    buffered or ``max_delay`` seconds have passed since the first buffered token.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        conversation_id: str,
+        response_id: str,
+        max_tokens: int = TOKEN_BATCH_SIZE,
+        max_delay: float = TOKEN_BATCH_DELAY,
+    ) -> None:
+        self._websocket = websocket
+        # Every frame of this response shares these fields, so encode them once: `{...,"tokens":`
+        self._frame_prefix = orjson.dumps(
+            {
+                "conversationId": conversation_id,
+                "responseId": response_id,
+                "type": "response-token",
+                "status": "streaming",
+            }
+        )[:-1] + b',"tokens":'
+        self._max_tokens = max_tokens
+        self._max_delay = max_delay
+        self._queue: asyncio.Queue[Optional[str]] = asyncio.Queue()
+        self._writer = asyncio.create_task(self._drain())
+
+    async def put(self, token: str) -> None:
+        await self._queue.put(token)
+
+    async def close(self) -> None:
+        """Flush any buffered tokens and wait for the writer to finish."""
+        await self._queue.put(None)
+        await self._writer
+
+    def cancel(self) -> None:
+        self._writer.cancel()
+
+    async def _drain(self) -> None:
+        loop = asyncio.get_running_loop()
+        closed = False
+        while not closed:
+            token = await self._queue.get()
+            if token is None:
+                return
+            tokens = [token]
+            deadline = loop.time() + self._max_delay
+            while len(tokens) < self._max_tokens:
+                try:
+                    token = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        token = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if token is None:
+                    closed = True
+                    break
+                tokens.append(token)
+            await send_frame(self._websocket, self._frame_prefix + orjson.dumps(tokens) + b"}", droppable=True)
+
+
 class BugFixerAgent:
     def __init__(self, config: AgentConfig, websocket: WebSocket, conversation_id: str) -> None:
         self._config = config
-        self._openai = OpenAI(api_key=config.openai.api_key)
-        self._codex = CodexClient(config.codex)
+        self._openai = openai_client
+        self._codex = codex_client
         self._git = GitClient(config.git)
         self._jira = JiraClient(config.jira)
         self._conversation: List[Dict[str, str]] = []
@@ -223,11 +467,14 @@ class BugFixerAgent:
         self._websocket = websocket
         self._conversation_id = conversation_id
         self._response_id = str(uuid.uuid4())
-        self.fetch_jira = self._jira.fetch_jira
-        self.pull_repo = self._git.pull
-        self.exec_codex = self._codex.exec_codex
-        self.web_search = web_search
-        self.query_jira_rag = query_jira_rag    
+        self._tool_handlers: Dict[str, Any] = {
+            "fetch_jira": self._jira.fetch_jira,
+            "pull_repo": self._git.pull,
+            "exec_codex": self._codex.exec_codex,
+            "web_search": web_search,
+            "query_jira_rag": aquery_jira_rag,
+            "batch": self.batch,
+        }
         self._step = ""
         self._step_Responses: List[str] = []
         self._step_Done = False
@@ -239,7 +486,7 @@ class BugFixerAgent:
         clean_prompt = unicodedata.normalize("NFKC", prompt or "")
         clean_prompt = clean_prompt.replace("\r\n", "\n").replace("\r", "\n")
         # Remove control chars except tab/newline
-        clean_prompt = re.sub(r"[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]", "", clean_prompt)
+        clean_prompt = clean_prompt.translate(_CTRL_TRANSLATE)
         clean_prompt = clean_prompt.strip()
 
         if len(clean_prompt) > MAX_PROMPT_CHARS:
@@ -272,7 +519,7 @@ class BugFixerAgent:
         )
         
         self._conversation = [
-            {"role": "system", "content": SYSTEM_PROMPT},
+            _SYSTEM_MESSAGE,
             {"role": "user", "content": prompt},
         ]
         history: List[Dict[str, Any]] = []
@@ -308,16 +555,7 @@ class BugFixerAgent:
                         )                   
                     else:
                         # JiraIntake rejected responsed and ERROR step responses
-                        async for token in self._stream_response(stepStartResponse):
-                            self._step_Responses.append(token)
-                            await send_event(
-                                self._websocket,
-                                conversationId=self._conversation_id,
-                                responseId=self._response_id,
-                                type="response-token",
-                                status="streaming",
-                                token = token,
-                            )
+                        await self._stream_tokens(stepStartResponse)
                         self._step_Responses.append("\n")
                         # Notify client step is compeleted.
                         print("Agent Step completed:", "".join(self._step_Responses))
@@ -357,8 +595,7 @@ class BugFixerAgent:
                 )
 
                 # Execute tool calls
-                for tc in model_reply.tool_calls:
-                    await self._execute_tool_call(tc)
+                await self._execute_tool_calls(model_reply.tool_calls)
                 
                 # Notify client step is compeleted.
                 print("Agent Step completed:", "".join(self._step_Responses))
@@ -372,22 +609,14 @@ class BugFixerAgent:
                 )
                 self._step_Done = True
             else:
-                self._conversation.append({"role": "assistant", "content": json.dumps(step_payload)})
+                # Keep the reply byte-identical to what the model produced so later requests share its prefix.
+                self._conversation.append({"role": "assistant", "content": model_reply.content or ""})
     
                 # Check for exit condition
                 if step_payload.get("step") == "Summary":
                     # Stream summary reasoning to client
                     summary_message = "AI Agent has completed all steps, bug has been fixed. Summary: \n\n" + step_payload.get("reasoning", "")
-                    async for token in self._stream_response(summary_message):
-                        self._step_Responses.append(token)
-                        await send_event(
-                            self._websocket,
-                            conversationId=self._conversation_id,
-                            responseId=self._response_id,
-                            type="response-token",
-                            status="streaming",
-                            token = token,
-                        )
+                    await self._stream_tokens(summary_message)
 
                     # Notify client step is compeleted.
                     print( "".join(self._step_Responses).strip())
@@ -413,9 +642,8 @@ class BugFixerAgent:
 
                     # exit the agent loop
                     break
-
-        if (iteration == self._config.max_iterations - 1):
-            # Notify client that max iterations reached without completion
+        else:
+            # Loop exhausted without a break: notify client that max iterations reached without completion
             warning_message = f"Agent reached maximum iterations ({self._config.max_iterations}) without completing the task."
             logger.info(warning_message)
             if (self._step_Done):
@@ -430,21 +658,71 @@ class BugFixerAgent:
             )
         return
 
-    async def _call_model(self) -> str:
-        logger.info("Calling model with conversation: %s", json.dumps(self._conversation,indent=4, ensure_ascii=False))
-        response = self._openai.chat.completions.create(
+    async def _call_model(self) -> _ModelReply:
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Calling model with conversation: %s", orjson.dumps(self._conversation, option=orjson.OPT_INDENT_2).decode())
+        cache_key = self._response_cache_key()
+        cached = _response_cache.get(cache_key)
+        if cached is not None:
+            logger.info("Model reply served from cache")
+            return cached
+        stream = await self._openai.chat.completions.create(
             model=self._config.openai.model,
             messages=self._conversation,
             tools=toolsForBugFix,
             temperature=self._config.openai.temperature,
+            stream=True,
+            # Route requests of one conversation to the same prompt cache.
+            extra_body={"prompt_cache_key": self._conversation_id},
+        )
+        try:
+            reply = await self._collect_stream(stream)
+        except asyncio.CancelledError:
+            # Stop generation (and billing) as soon as the user stops the response.
+            await stream.close()
+            raise
+        _response_cache.set(cache_key, reply)
+        return reply
+
+    @staticmethod
+    async def _collect_stream(stream) -> _ModelReply:
+        """Accumulate content and tool-call fragments from a completion stream."""
+        content_parts: List[str] = []
+        tool_calls: Dict[int, _ToolCall] = {}
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if delta.content:
+                content_parts.append(delta.content)
+            for tc_delta in delta.tool_calls or []:
+                call = tool_calls.setdefault(tc_delta.index, _ToolCall())
+                if tc_delta.id:
+                    call.id = tc_delta.id
+                if tc_delta.type:
+                    call.type = tc_delta.type
+                if tc_delta.function:
+                    call.function.name += tc_delta.function.name or ""
+                    call.function.arguments += tc_delta.function.arguments or ""
+        return _ModelReply(
+            content="".join(content_parts) or None,
+            tool_calls=[tool_calls[index] for index in sorted(tool_calls)] or None,
+        )
+
+    def _response_cache_key(self) -> bytes:
+        request = (
+            self._config.openai.model,
+            self._config.openai.temperature,
+            self._conversation,
         )
-        choice = response.choices[0].message
-        return choice or "{}"
+        digest = hashlib.blake2b(orjson.dumps(request), digest_size=16)
+        digest.update(TOOLS_JSON)
+        return digest.digest()
 
     def _parse_step_payload(self, content: str) -> Dict[str, Any]:
         try:
-            payload = json.loads(content)
-        except json.JSONDecodeError as exc:
+            payload = orjson.loads(content)
+        except orjson.JSONDecodeError as exc:
             raise AgentProtocolError(f"Model response is not valid JSON: {exc}") from exc
 
         if "step" not in payload:
@@ -467,12 +745,54 @@ class BugFixerAgent:
             )
         return payloads
     
-    async def _execute_tool_call(self,tc) -> None:
+    async def _execute_tool_calls(self, tool_calls) -> None:
+        """Announce each tool call, run the handlers, then record results in call order.
+
+        Consecutive read-only lookups (CONCURRENT_TOOLS) run concurrently; any other
+        tool (pull_repo, exec_codex, ...) waits for everything before it and runs alone,
+        so e.g. Codex never starts against a checkout that is still being pulled.
+        """
+        announced = []
+        for tc in tool_calls:
+            name, args = await self._announce_tool_call(tc)
+            announced.append((tc, name, args, self._response_id))
+
+        results: List[str] = []
+        pending = []
+        for _, name, args, _ in announced:
+            if name in CONCURRENT_TOOLS:
+                pending.append(self._invoke_tool(name, args))
+                continue
+            results.extend(await asyncio.gather(*pending))
+            pending = []
+            results.append(await self._invoke_tool(name, args))
+        results.extend(await asyncio.gather(*pending))
+
+        for (tc, name, _, response_id), content in zip(announced, results):
+            self._response_id = response_id
+            if len(content) > MAX_ACTION_PREVIEW:
+                content = (
+                    content[:MAX_ACTION_PREVIEW]
+                    + f"\n...[truncated: full output {len(content)} chars, showing first {MAX_ACTION_PREVIEW}]"
+                )
+            self._conversation.append(
+                {
+                    "role": "tool",
+                    "tool_call_id": getattr(tc, "id", ""),
+                    "content": content,
+                }
+            )
+
+            # Notify client of tool call result
+            toolResponse = f"\n\n Tool {name}, result:\n {content}"
+            await self._stream_tokens(toolResponse)
+
+    async def _announce_tool_call(self, tc) -> Tuple[str, Any]:
         name = getattr(tc.function, "name", "")
         raw_args = getattr(tc.function, "arguments", "") or "{}"
         try:
-            args = json.loads(raw_args) if raw_args else {}
-        except json.JSONDecodeError:
+            args = orjson.loads(raw_args) if raw_args else {}
+        except orjson.JSONDecodeError:
             args = {"_raw": raw_args}
 
         # Tool calls present, content is None, notify client about tool calls
@@ -483,9 +803,10 @@ class BugFixerAgent:
             # Notify client of step start
             stepStartResponse = f"Model requested tool calls: tool: {name}, prompt: \n {prompt}"
         else:
-            print(f"Model requested tool calls: tool: {name}, args: \n {json.dumps(args, indent=4, ensure_ascii=False)}")
             # Notify client of step start
-            stepStartResponse = f"Model requested tool calls: tool: {name}, args: \n {json.dumps(args, indent=4, ensure_ascii=False)}"
+            pretty_args = orjson.dumps(args, option=orjson.OPT_INDENT_2).decode()
+            stepStartResponse = f"Model requested tool calls: tool: {name}, args: \n {pretty_args}"
+            print(stepStartResponse)
         
         if (self._step != "JiraIntake"):
             self._response_id = str(uuid.uuid4())
@@ -497,76 +818,83 @@ class BugFixerAgent:
                 status="thinking",
                 metadata={"promptPreview": stepStartResponse},
             )
-            async for token in self._stream_response(stepStartResponse):
-                self._step_Responses.append(token)
-                await send_event(
-                    self._websocket,
-                    conversationId=self._conversation_id,
-                    responseId=self._response_id,
-                    type="response-token",
-                    status="streaming",
-                    token = token,
-                )
+            await self._stream_tokens(stepStartResponse)
             self._step_Responses.append("\n")
         else:
-            async for token in self._stream_response(stepStartResponse):
-                self._step_Responses.append(token)
-                await send_event(
-                    self._websocket,
-                    conversationId=self._conversation_id,
-                    responseId=self._response_id,
-                    type="response-token",
-                    status="streaming",
-                    token = token,
-                )
+            await self._stream_tokens(stepStartResponse)
             self._step_Responses.append("\n")
-        
+        return name, args
+
+    async def _invoke_tool(self, name: str, args: Any) -> str:
+        """Run a tool handler (or reuse a recent identical call) and return model-consumable text."""
+        if name in UNCACHED_TOOLS:
+            return await self._run_tool(name, args)
+
+        try:
+            cache_key = (name, hashlib.blake2b(orjson.dumps(args, option=orjson.OPT_SORT_KEYS), digest_size=16).digest())
+        except TypeError:
+            return await self._run_tool(name, args)
+        cached = _tool_cache.get(cache_key)
+        if cached is not None:
+            logger.info("Tool %s served from cache", name)
+            return cached
+
+        content = await self._run_tool(name, args)
+        if not content.startswith("error"):
+            _tool_cache.set(cache_key, content)
+        return content
+
+    async def _run_tool(self, name: str, args: Any) -> str:
         try:
-            handler = getattr(self, f"tool_{name}", None) or getattr(self, name, None)
-            if callable(handler):
-                maybe = handler(**args)
-                result = await maybe if asyncio.iscoroutine(maybe) else maybe
+            handler = self._tool_handlers.get(name)
+            if handler is None:
+                return f"error: No tool handler found for {name}"
+            if asyncio.iscoroutinefunction(handler):
+                result = await handler(**args)
             else:
-                call_method = getattr(self, "call_tool", None)
-                if callable(call_method):
-                    maybe = call_method(name, args)
-                    result = await maybe if asyncio.iscoroutine(maybe) else maybe
-                else:
-                    result_obj = {"error": f"No tool handler found for {name}"}
+                # Blocking handlers must not stall concurrent tool calls.
+                result = await asyncio.to_thread(handler, **args)
         except Exception as exc:
             result = "error:" + str(exc)
 
         if (result is None):
-            content = "No result returned."
-        else:
-            content = result
-        if len(content) > MAX_ACTION_PREVIEW:
-            content = content[:MAX_ACTION_PREVIEW] + "...[truncated]"
-        self._conversation.append(
-            {
-                "role": "tool",
-                "tool_call_id": getattr(tc, "id", ""),
-                "content": content,
-            }
-        )
-        
-        # Notify client of tool call result
-        toolResponse = f"\n\n Tool {name}, result:\n {content}"
-        async for token in self._stream_response(toolResponse):
-            self._step_Responses.append(token)
-            await send_event(
-                self._websocket,
-                conversationId=self._conversation_id,
-                responseId=self._response_id,
-                type="response-token",
-                status="streaming",
-                token = token,
-            )
+            return "No result returned."
+        if not isinstance(result, str):
+            # Structured results (e.g. the RAG match) are serialized once, here, for the model.
+            return orjson.dumps(result).decode()
+        return result
+
+    async def batch(self, calls: List[Dict[str, Any]]) -> str:
+        """Run independent read-only tool calls concurrently and return their results in order."""
+        async def run_one(call: Dict[str, Any]) -> str:
+            name = call.get("name", "")
+            if name not in CONCURRENT_TOOLS:
+                return f"error: {name} cannot run inside batch; call it on its own"
+            return await self._invoke_tool(name, call.get("arguments") or {})
+
+        results = await asyncio.gather(*(run_one(call) for call in calls))
+        return orjson.dumps(
+            [{"name": call.get("name", ""), "result": result} for call, result in zip(calls, results)]
+        ).decode()
+
+    async def _stream_tokens(self, text: str) -> None:
+        """Stream ``text`` to the client as batched token frames."""
+        batcher = _TokenBatcher(self._websocket, self._conversation_id, self._response_id)
+        try:
+            async for token in self._stream_response(text):
+                self._step_Responses.append(token)
+                await batcher.put(token)
+        except BaseException:
+            batcher.cancel()
+            raise
+        await batcher.close()
 
     async def _stream_response(self, response: str) -> AsyncGenerator[str, None]:
-        """Yield tokens with slight delay to simulate an AI response."""
+        """Yield whitespace-split tokens, optionally paced to simulate typing."""
+        simulate_typing = self._config.simulate_typing
         for token in response.split(" "):
-            await asyncio.sleep(self._next_delay())
+            if simulate_typing:
+                await asyncio.sleep(self._next_delay())
             yield f"{token} "
 
     def _next_delay(self) -> float:
@@ -1,7 +1,8 @@
 """Thin wrapper around the Codex CLI."""
 import asyncio
 import os
-import subprocess
+import time
+from pathlib import Path
 from typing import List, Optional
 from dotenv import load_dotenv
 
@@ -10,6 +11,10 @@ load_dotenv()
 
 from config import CodexConfig
 
+# After a `codex login`, auth failures within this window are not retried with yet another login:
+# credentials that fresh being rejected means re-logging in won't help.
+LOGIN_TTL = 3600.0
+
 class CodexCLIError(RuntimeError):
     """Raised when the Codex CLI returns a non-zero exit status."""
     pass
@@ -17,24 +22,66 @@ class CodexCLIError(RuntimeError):
 class CodexClient:
     def __init__(self, config: CodexConfig) -> None:
         self._config = config
+        self._logged_in_at: Optional[float] = None
+        # Codex edits the shared project checkout, so runs are serialized.
+        self._lock = asyncio.Lock()
+        self._proc: Optional[asyncio.subprocess.Process] = None
 
     async def _run(self, cmd: List[str], input_text: Optional[str] = None) -> str:
         """Run a Codex CLI command asynchronously."""
-        proc = await asyncio.create_subprocess_exec(
-            *cmd,
-            cwd=self._config.project_path,  # ← set working directory
-            stdin=asyncio.subprocess.PIPE, 
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-        )
-        out, err = await proc.communicate(
-            input=input_text.encode() if input_text else None 
-        ) 
+        async with self._lock:
+            proc = await asyncio.create_subprocess_exec(
+                *cmd,
+                cwd=self._config.project_path,  # ← set working directory
+                stdin=asyncio.subprocess.PIPE, 
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            self._proc = proc
+            try:
+                out, err = await proc.communicate(
+                    input=input_text.encode() if input_text else None 
+                ) 
+            except asyncio.CancelledError:
+                # The caller gave up (e.g. the user stopped the response); don't leave Codex running.
+                await self._terminate(proc)
+                raise
+            finally:
+                self._proc = None
         if proc.returncode != 0:
             raise CodexCLIError(f"Codex CLI command {' '.join(cmd)} failed: {err.decode()}")
         
         return(out.decode())
 
+    async def close(self) -> None:
+        """Terminate the Codex process still in flight, if any."""
+        if self._proc is not None:
+            await self._terminate(self._proc)
+
+    @staticmethod
+    async def _terminate(proc: asyncio.subprocess.Process) -> None:
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+
+    @staticmethod
+    def _auth_file() -> Path:
+        return Path(os.getenv("CODEX_HOME", "~/.codex")).expanduser() / "auth.json"
+
+    async def ensure_login(self, force: bool = False) -> bool:
+        """Log in when Codex has no stored credentials, or with ``force`` after an auth failure.
+
+        A forced login is skipped when the last one was less than LOGIN_TTL ago.
+        Returns whether `codex login` was run.
+        """
+        if force:
+            if self._logged_in_at is not None and time.monotonic() - self._logged_in_at < LOGIN_TTL:
+                return False
+        elif self._auth_file().exists():
+            return False
+        await self.login_codex()
+        self._logged_in_at = time.monotonic()
+        return True
 
     async def login_codex(self):
         api_key = self._config.api_key
@@ -47,17 +94,20 @@ class CodexClient:
     async def exec_codex(self,prompt:str) -> str:
         print(f"🧠 Running Codex CLI prompt: {prompt}")
         cmd = ["codex", "exec", prompt, "--full-auto"]
-        output = await self._run(cmd)
+        try:
+            output = await self._run(cmd)
+        except CodexCLIError as exc:
+            detail = str(exc).lower()
+            if "401" not in detail and "unauthorized" not in detail:
+                raise
+            # Stored credentials were rejected: log in again and retry once, unless we just did.
+            if not await self.ensure_login(force=True):
+                raise
+            output = await self._run(cmd)
         print("📝 Codex output:\n", output)
         return output
     
 if __name__ == "__main__":
-    import os
-    from dotenv import load_dotenv
-    load_dotenv()
-    
-    import asyncio
-
     codex_config = CodexConfig.from_env()
     codex_client = CodexClient(codex_config)
     asyncio.run(codex_client.login_codex())
@@ -17,11 +17,19 @@ def _require(name: str, value: Optional[str]) -> str:
     raise ConfigError(f"Missing required configuration value: {name}")
 
 
+def _flag(value: Optional[str], default: bool) -> bool:
+    if value is None:
+        return default
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
 @dataclass(frozen=True)
 class OpenAIConfig:
     api_key: str
     model: str = "gpt-5"
     temperature: float = 0.4
+    # Seconds an identical (model, conversation, tools) request is answered from cache; 0 disables it.
+    response_cache_ttl: float = 300.0
 
     @classmethod
     def from_env(cls) -> "OpenAIConfig":
@@ -29,6 +37,7 @@ class OpenAIConfig:
             api_key=_require("OPENAI_API_KEY", os.getenv("OPENAI_API_KEY")),
             model=os.getenv("OPENAI_MODEL", cls.model),
             temperature=float(os.getenv("OPENAI_TEMPERATURE", cls.temperature)),
+            response_cache_ttl=float(os.getenv("OPENAI_RESPONSE_CACHE_TTL", cls.response_cache_ttl)),
         )
 
 
@@ -37,6 +46,7 @@ class JiraConfig:
     base_url: str
     api_token: str
     email: str
+    max_concurrency: int = 20
 
     @classmethod
     def from_env(cls) -> "JiraConfig":
@@ -44,6 +54,7 @@ class JiraConfig:
             base_url=_require("JIRA_BASE_URL", os.getenv("JIRA_BASE_URL")),
             api_token=_require("JIRA_API_TOKEN", os.getenv("JIRA_API_TOKEN")),
             email=_require("JIRA_EMAIL", os.getenv("JIRA_EMAIL")),
+            max_concurrency=int(os.getenv("JIRA_MAX_CONCURRENCY", cls.max_concurrency)),
         )
 
 
@@ -89,6 +100,8 @@ class AgentConfig:
     codex: CodexConfig
     git: GitConfig
     max_iterations: int = 12
+    # Pace streamed tokens like a human typist; purely cosmetic, off by default.
+    simulate_typing: bool = False
 
     @classmethod
     def from_env(cls) -> "AgentConfig":
@@ -98,5 +111,6 @@ class AgentConfig:
             codex=CodexConfig.from_env(),
             git=GitConfig.from_env(),
             max_iterations=int(os.getenv("BUGFIX_AGENT_MAX_ITERS", cls.max_iterations)),
+            simulate_typing=_flag(os.getenv("BUGFIX_AGENT_SIMULATE_TYPING"), cls.simulate_typing),
         )
 
@@ -3,7 +3,7 @@
 from __future__ import annotations
 
 import asyncio
-import subprocess
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Iterable, List, Optional
 
@@ -14,6 +14,13 @@ class GitCommandError(RuntimeError):
     pass
 
 
+@dataclass(frozen=True)
+class GitResult:
+    returncode: int
+    stdout: str
+    stderr: str
+
+
 class GitClient:
     def __init__(self, config: GitConfig) -> None:
         self._config = config
@@ -22,39 +29,40 @@ class GitClient:
     def repo_root(self) -> Path:
         return self._config.repo_root
 
-    def _run(
+    async def _run(
         self,
         args: Iterable[str],
         *,
         check: bool = True,
-        capture_output: bool = True,
-        text: bool = True,
         input_text: Optional[str] = None,
-    ) -> subprocess.CompletedProcess[str]:
+    ) -> GitResult:
 
         command: List[str] = ["git", *args]
-        result = subprocess.run(
-            command,
+        proc = await asyncio.create_subprocess_exec(
+            *command,
             cwd=self.repo_root,
-            check=False,
-            capture_output=capture_output,
-            text=text,
-            input=input_text,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        out, err = await proc.communicate(
+            input=input_text.encode() if input_text else None
         )
+        result = GitResult(proc.returncode, out.decode(), err.decode())
         if check and result.returncode != 0:
             raise GitCommandError(
-                f"git {' '.join(args)} failed ({result.returncode}): {result.stderr.strip()}"
+                f"{' '.join(command)} failed ({result.returncode}): {result.stderr.strip()}"
             )
         return result
 
     async def pull(self,repo: str) -> str:
-        output = self._run(["init"]).stdout.strip()
-        self._run(["branch", "-M", "main"])
-        tempOutput = (self._run(["remote", "-v"])).stdout.strip()
+        output = (await self._run(["init"])).stdout.strip()
+        await self._run(["branch", "-M", "main"])
+        tempOutput = (await self._run(["remote", "-v"])).stdout.strip()
         if (tempOutput.find("origin") != -1):
-            self._run(["remote", "remove", "origin"])
-        self._run(["remote", "add", "origin", repo])
-        self._run(["pull", "origin", "main"])
+            await self._run(["remote", "remove", "origin"])
+        await self._run(["remote", "add", "origin", repo])
+        await self._run(["pull", "origin", "main"])
         output = output + "\n Successfully pulled the source code from " + repo
         return output
 
@@ -2,71 +2,186 @@
 
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+import asyncio
+import re
+from typing import Any, Dict, List, Optional, Tuple
 
-import requests
+import httpx
+import orjson
 
+import _adf
+from cache import TTLCache
 from config import JiraConfig
 import os
 import sys
-import json
+
+
+# Jira issue keys look like PROJ-123.
+JIRA_KEY_RE = re.compile(r"\b[A-Z][A-Z0-9]+-\d+\b")
+
+# The only fields fetch_jira reads; requesting just these keeps issue payloads small.
+ISSUE_FIELDS = "summary,description,customfield_10076"
+
+# Idempotent requests answered with one of these statuses are retried with exponential backoff.
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+MAX_RETRIES = 3
+RETRY_BACKOFF = 0.2
+ISSUE_CACHE_SIZE = 256
+ISSUE_CACHE_TTL = 300.0
+# Validators outlive the issue cache so an expired issue can be revalidated with a bodiless 304.
+ETAG_CACHE_SIZE = 1024
+
+# Endpoint paths relative to /rest/api/3/.
+_ISSUE_PATH = "issue/{}"
+_COMMENT_PATH = "issue/{}/comment"
+
+_shared_client: Optional[httpx.AsyncClient] = None
+# Issues keyed by (base_url, account, issue_key, fields), shared by every JiraClient.
+_issue_cache: TTLCache[Dict[str, Any]] = TTLCache(ISSUE_CACHE_SIZE, ttl=ISSUE_CACHE_TTL)
+# Requests currently on the wire, so concurrent fetches of the same issue share one round trip.
+_inflight: Dict[Tuple[str, ...], asyncio.Task] = {}
+# Extracted (description, reproduce procedures) text per issue key, tagged with the issue dict it
+# came from so a refetched issue is re-extracted rather than served stale. The identity check is
+# what keeps it fresh, so it is a plain LRU with no TTL, sized like _etags so an issue revalidated
+# with a 304 (same dict) still finds its text.
+_extracted: TTLCache[Tuple[Dict[str, Any], List[str]]] = TTLCache(ETAG_CACHE_SIZE)
+# (ETag, issue) per issue cache key, sent back as If-None-Match once the cached issue expires.
+_etags: TTLCache[Tuple[str, Dict[str, Any]]] = TTLCache(ETAG_CACHE_SIZE)
 
 
 class JiraError(RuntimeError):
     pass
 
 
+def _get_shared_client() -> httpx.AsyncClient:
+    """Connection pool shared by every JiraClient so agent runs reuse warm TLS connections."""
+    global _shared_client
+    if _shared_client is None or _shared_client.is_closed:
+        _shared_client = httpx.AsyncClient(
+            headers={"Content-Type": "application/json", "Accept": "application/json"},
+            timeout=30.0,
+            transport=httpx.AsyncHTTPTransport(
+                retries=MAX_RETRIES,
+                limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+            ),
+        )
+    return _shared_client
+
+
+async def close_shared_client() -> None:
+    global _shared_client
+    if _shared_client is not None:
+        await _shared_client.aclose()
+        _shared_client = None
+
+
 class JiraClient:
-    def __init__(self, config: JiraConfig, session: Optional[requests.Session] = None) -> None:
+    def __init__(self, config: JiraConfig, client: Optional[httpx.AsyncClient] = None) -> None:
         self._config = config
-        self._session = session or requests.Session()
-        self._session.auth = (config.email, config.api_token)
-        self._session.headers.update({"Content-Type": "application/json", "Accept": "application/json"})
+        self._client = client or _get_shared_client()
+        # Auth is sent per request so clients for different Jira accounts can share the pool.
+        self._auth = (config.email, config.api_token)
+        self._base = config.base_url.rstrip("/") + "/rest/api/3/"
 
     def _url(self, path: str) -> str:
-        base = self._config.base_url.rstrip("/")
-        return f"{base}/rest/api/3/{path.lstrip('/')}"
+        return self._base + path.lstrip("/")
+
+    async def _send(self, method: str, path: str, **kwargs: Any) -> httpx.Response:
+        """Send a request, retrying idempotent ones; raises JiraError unless it succeeded or was a 304."""
+        method = method.upper()
+        url = self._url(path)
+        for attempt in range(MAX_RETRIES + 1):
+            response = await self._client.request(method, url, auth=self._auth, **kwargs)
+            if response.status_code not in RETRY_STATUSES or method != "GET" or attempt == MAX_RETRIES:
+                break
+            await asyncio.sleep(RETRY_BACKOFF * 2 ** attempt)
+        if not response.is_success and response.status_code != 304:
+            # Never decode the whole body to str just to build an error message.
+            raise JiraError(f"Jira API {method} {path} failed: {response.status_code} {response.content[:512]!r}")
+        return response
 
     async def _request(self, method: str, path: str, **kwargs: Any) -> Any:
-        response = self._session.request(method.upper(), self._url(path), **kwargs)
-        if not response.ok:
-            raise JiraError(f"Jira API {method} {path} failed: {response.status_code} {response.text}")
-        if response.text:
-            return response.json()
-        return None
+        body = (await self._send(method, path, **kwargs)).content
+        return orjson.loads(body) if body else None
 
     async def fetch_issue(self, issue_key: str, fields:str) -> Dict[str, Any]:
+        key = (self._config.base_url, self._config.email, issue_key, fields or "")
+        cached = _issue_cache.get(key)
+        if cached is not None:
+            return cached
+        task = _inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load_issue(key, issue_key, fields))
+            _inflight[key] = task
+            task.add_done_callback(lambda _: _inflight.pop(key, None))
+        # Shield so one caller being cancelled doesn't cancel the request other callers are sharing.
+        return await asyncio.shield(task)
+
+    async def fetch_issues(self, issue_keys: List[str], fields: str) -> List[Dict[str, Any]]:
+        """Fetch several issues concurrently, at most ``max_concurrency`` on the wire at once."""
+        semaphore = asyncio.Semaphore(self._config.max_concurrency)
+
+        async def fetch_one(issue_key: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.fetch_issue(issue_key, fields)
+
+        return list(await asyncio.gather(*(fetch_one(issue_key) for issue_key in issue_keys)))
+
+    async def _load_issue(self, key: Tuple[str, ...], issue_key: str, fields: str) -> Dict[str, Any]:
         params = {"fields": fields} if fields else None
-        return await self._request("GET", f"issue/{issue_key}", params=params)
+        validator = _etags.get(key)
+        headers = {"If-None-Match": validator[0]} if validator is not None else None
+        response = await self._send("GET", _ISSUE_PATH.format(issue_key), params=params, headers=headers)
+        if response.status_code == 304 and validator is not None:
+            # Unchanged since we last saw it: reuse the same dict, so fetch_jira's identity-checked
+            # _extracted entry still matches and the ADF is not walked again.
+            issue = validator[1]
+        else:
+            issue = orjson.loads(response.content)
+            etag = response.headers.get("ETag")
+            if etag:
+                _etags.set(key, (etag, issue))
+            else:
+                _etags.pop(key)
+        _issue_cache.set(key, issue)
+        return issue
 
     async def add_comment(self, issue_key: str, comment: str) -> Dict[str, Any]:
         payload = {"body": comment}
-        return await self._request("POST", f"issue/{issue_key}/comment", json=payload)
+        return await self._request("POST", _COMMENT_PATH.format(issue_key), content=orjson.dumps(payload))
     
     def extract_text(self,node):
-        """Recursively extract text from ProseMirror-style content structure."""
-        if isinstance(node, dict):
-            if node.get('type') == 'text':
-                return node.get('text', '')
-            elif 'content' in node:
-                return '\n'.join(self.extract_text(child) for child in node['content'])
-        elif isinstance(node, list):
-            return '\n'.join(self.extract_text(item) for item in node)
-        return ''      
+        """Extract text from ProseMirror-style content structure, one text node per line."""
+        return _adf.extract_text(node)
+
+    def extract_texts(self, nodes: List[Any]) -> List[str]:
+        """Extract text from several ProseMirror-style trees in one pass."""
+        return _adf.extract_texts(nodes)
     
-    async def fetch_jira(self, jiraNo: str) -> Dict[str, Any]:
+    async def fetch_jira(self, jiraNo: str, issue: Optional[Dict[str, Any]] = None) -> str:
+        # Pull the key out of whatever the model passed ("ai-5", "Jira AI-5", ...) before hitting the API.
+        match = JIRA_KEY_RE.search(jiraNo.upper())
+        if match is None:
+            raise JiraError(f"{jiraNo!r} does not contain a Jira issue key")
+        jiraNo = match.group(0)
         try:
-            issue= await self.fetch_issue(jiraNo,"summary,description,customfield_10076")
-            
-            Jira_json=f"""
-{{
-    "summary": {issue["fields"]["summary"]},
-    "description": {self.extract_text(issue["fields"]["description"])},
-    "reproduce procedures": {self.extract_text(issue["fields"]["customfield_10076"])}
-}}"""
-
-            # return json.dumps(Jira_json, indent=2, ensure_ascii=False)
-            return Jira_json
+            if issue is None:
+                issue = await self.fetch_issue(jiraNo, ISSUE_FIELDS)
+            fields = issue["fields"]
+            key = (self._config.base_url, jiraNo)
+            cached = _extracted.get(key)
+            if cached is not None and cached[0] is issue:
+                texts = cached[1]
+            else:
+                texts = self.extract_texts([fields["description"], fields["customfield_10076"]])
+                _extracted.set(key, (issue, texts))
+            description, reproduce = texts
+            payload = {
+                "summary": fields["summary"],
+                "description": description,
+                "reproduce procedures": reproduce,
+            }
+            return orjson.dumps(payload).decode()
         except JiraError as exc:
             raise JiraError(f"Failed to fetch Jira issue {jiraNo}: {exc}")
 
@@ -82,26 +197,12 @@ if __name__ == "__main__":
 
     async def main():
         try:
-            issue = await client.fetch_issue(issue_key, "summary,description,customfield_10076")
-            Jira_json=f"""
-{{
-    "summary": {issue["fields"]["summary"]},
-    "description": {client.extract_text(issue["fields"]["description"])},
-    "reproduce procedures": {client.extract_text(issue["fields"]["customfield_10076"])}
-}}"""
-            print(Jira_json)
-            # print(json.dumps(
-            #     {
-            #         "key": issue['key'],
-            #         "summary": issue['fields']['summary'],
-            #         "description": client.extract_text(issue['fields']['description']),
-            #         "reproduce procedures": client.extract_text(issue['fields']['customfield_10076'])
-            #     },
-            #     indent=4,
-            #     ensure_ascii=False,
-            # ))
+            issue = await client.fetch_issue(issue_key, ISSUE_FIELDS)
+            print(await client.fetch_jira(issue_key, issue=issue))
         except JiraError as exc:
             print(f"Error: {exc}")
             sys.exit(2)
+        finally:
+            await close_shared_client()
 
     asyncio.run(main())
\ No newline at end of file
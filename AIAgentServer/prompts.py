@@ -3,12 +3,15 @@
 from textwrap import dedent
 from typing import Any, Dict
 
+import orjson
+
 SYSTEM_PROMPT = dedent(
     """
     You are professional software developer, an autonomous software-debugging agent.
     Your task is to diagnose and fix bugs in a codebase based on a Jira issue report.
-    You are an AI agent with access to tools (fetch_jira, pull_repo, query_jira_rag,exec_codex, web_search). 
+    You are an AI agent with access to tools (fetch_jira, pull_repo, query_jira_rag,exec_codex, web_search, batch). 
     You can only run one tool at a time, and must wait for the tool's output before proceeding.
+    The only exception is independent lookups (fetch_jira, query_jira_rag, web_search), which can be combined into a single batch call that runs them concurrently; pull_repo and exec_codex can never be batched.
     you have access to a Jira client to fetch issue details.
     You also have access to a Git client to pull code and apply patches, which need to be done before running Codex CLI commands.
     You have access to a RAG client to query similar solved Jira issues to find potential solutions.
@@ -72,75 +75,69 @@ SYSTEM_PROMPT = dedent(
     """
 ).strip()
 
-toolsForBugFix = [
-        {
-            "type": "function",
-            "function": {
-                "name": "fetch_jira",
-                "description": "Fetch Jira issue details by jira number. This is used to understand the Jira issue, get reproduction steps.",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "jiraNo": {"type": "string"}
-                    },
-                    "required": ["jiraNo"]
-                }
-            }
-        },
-        {
-            "type": "function",
-            "function": {
-                "name": "pull_repo",
-                "description": "Pull the latest changes from the repository. This is used to set up the local git repository before calling Codex CLI commands.",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "repo": {"type": "string"},
-                    },
-                    "required": ["repo"]
-                }
-            }
-        },
-        {
-            "type": "function",
-            "function": {
-                "name": "query_jira_rag",
-                "description": "Query the JIRA RAG system to find similar solved issues and their solutions. This is used to gather potential solutions from past issues.",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "query_text": {"type": "string"},
-                    },
-                    "required": ["query_text"]
-                }
-            }
+
+def _function_tool(name: str, description: str, properties: Dict[str, Any]) -> Dict[str, Any]:
+    """Build an OpenAI function-tool spec whose parameters are all required."""
+    return {
+        "type": "function",
+        "function": {
+            "name": name,
+            "description": description,
+            "parameters": {
+                "type": "object",
+                "properties": properties,
+                "required": list(properties),
+            },
         },
-        {
-            "type": "function",
-            "function": {
-                "name": "exec_codex",
-                "description": "Execute a Codex CLI query. This is used to reproduce issue, localize errors, plan fixes, and validate patches.",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "prompt": {"type": "string"},
-                    },
-                    "required": ["prompt"]
-                }
-            }
+    }
+
+
+_STRING = {"type": "string"}
+
+_FETCH_JIRA = _function_tool(
+    "fetch_jira",
+    "Fetch Jira issue details by jira number. This is used to understand the Jira issue, get reproduction steps.",
+    {"jiraNo": _STRING},
+)
+_PULL_REPO = _function_tool(
+    "pull_repo",
+    "Pull the latest changes from the repository. This is used to set up the local git repository before calling Codex CLI commands.",
+    {"repo": _STRING},
+)
+_QUERY_JIRA_RAG = _function_tool(
+    "query_jira_rag",
+    "Query the JIRA RAG system to find similar solved issues and their solutions. This is used to gather potential solutions from past issues.",
+    {"query_text": _STRING},
+)
+_EXEC_CODEX = _function_tool(
+    "exec_codex",
+    "Execute a Codex CLI query. This is used to reproduce issue, localize errors, plan fixes, and validate patches.",
+    {"prompt": _STRING},
+)
+_WEB_SEARCH = _function_tool(
+    "web_search",
+    "Execute a web search query. This is used to gather additional information from the web.",
+    {"query": _STRING},
+)
+_BATCH = _function_tool(
+    "batch",
+    "Run several independent read-only lookups (fetch_jira, query_jira_rag, web_search) concurrently in one step. Results are returned as a JSON array in the same order as the calls. pull_repo, exec_codex and batch are not allowed inside a batch.",
+    {
+        "calls": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "name": _STRING,
+                    "arguments": {"type": "object"},
+                },
+                "required": ["name", "arguments"],
+            },
         },
-        {
-            "type": "function",
-            "function": {
-                "name": "web_Search",
-                "description": "Execute a web search query. This is used to gather additional information from the web.",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "query": {"type": "string"},
-                    },
-                    "required": ["query"]
-                }
-            }
-        }
-    ]
+    },
+)
+
+# A tuple so no caller can append to the shared tool list and desync it from TOOLS_JSON.
+toolsForBugFix = (_FETCH_JIRA, _PULL_REPO, _QUERY_JIRA_RAG, _EXEC_CODEX, _WEB_SEARCH, _BATCH)
+# Encoded once so callers that need the tool list as JSON don't re-serialize it per request.
+TOOLS_JSON = orjson.dumps(toolsForBugFix)
@@ -1,8 +1,14 @@
+import asyncio
+import functools
+import importlib.util
 import json
 import os
-from typing import List, Tuple, Optional, Iterable, Hashable, Dict, Any
+import threading
+from typing import List, Tuple, Optional, Iterable, Hashable, Dict, Any, Sequence, Set
 from pathlib import Path
 
+import chromadb
+import numpy as np
 import torch
 from sentence_transformers import CrossEncoder
 from langchain_core.documents import Document
@@ -20,6 +26,224 @@ CURRENT_DIR = Path(__file__).parent
 # Must match CHROMA_PERSIST_DIR in create_rag.py
 CHROMA_PERSIST_DIR = CURRENT_DIR.parent / "db" / "chroma" / "jira"
 
+DEFAULT_RERANKER_MODEL = "cross-encoder/ms-marco-MiniLM-L-12-v2"
+
+# Quantized ONNX export loaded for CPU reranking (relative to the model repo); empty disables it.
+# Pick the variant matching the host CPU, e.g. onnx/model_qint8_avx2.onnx or onnx/model_quint8_avx2.onnx.
+RERANKER_ONNX_FILE = os.getenv("RERANKER_ONNX_FILE", "onnx/model_qint8_avx512_vnni.onnx")
+
+# Passages are cut to this many characters and the tokenizer to this many tokens before
+# scoring; attention cost grows with sequence length and ranking needs only the opening text.
+RERANK_MAX_CHARS = 2000
+RERANK_MAX_LENGTH = 256
+RERANK_BATCH_SIZE = 64
+# Larger batches keep a GPU busy; cards with <= 8 GB of memory use the small size to avoid OOM.
+RERANK_GPU_BATCH_SIZE = 128
+RERANK_SMALL_GPU_BATCH_SIZE = 32
+SMALL_GPU_MEMORY = 8 * 1024 ** 3
+
+# Queries whose embeddings are at least this cosine-similar to a recently answered one reuse its result.
+SEMANTIC_CACHE_SIZE = 256
+SEMANTIC_CACHE_MIN_SIMILARITY = 0.97
+
+# Concurrent async queries arriving within this window share one embeddings request.
+EMBED_BATCH_WINDOW = 0.008
+EMBED_MAX_BATCH = 64
+
+# When CHROMA_HOST is set, query a Chroma server (which keeps the HNSW index resident
+# across queries and processes) instead of opening the persisted SQLite store in-process.
+CHROMA_HOST = os.getenv("CHROMA_HOST")
+CHROMA_PORT = int(os.getenv("CHROMA_PORT", "8000"))
+CHROMA_COLLECTION = os.getenv("CHROMA_COLLECTION", "langchain")
+
+# Opened Chroma collections keyed by persist_dir, reused across queries.
+_vector_stores: Dict[str, Chroma] = {}
+
+
+# ==========================
+# Model / store handles
+# ==========================
+
+@functools.lru_cache(maxsize=4)
+def _get_cross_encoder(name: str, device: str) -> CrossEncoder:
+    """Load a CrossEncoder once per (model, device); loading weights dominates short reranks.
+
+    On CPU the int8-quantized ONNX export is preferred when onnxruntime/optimum are
+    installed; otherwise (or if the model has no such export) the PyTorch weights are used.
+    """
+    if device == "cpu" and RERANKER_ONNX_FILE and _has_onnx_backend():
+        try:
+            return CrossEncoder(
+                name,
+                device=device,
+                max_length=RERANK_MAX_LENGTH,
+                backend="onnx",
+                model_kwargs={"file_name": RERANKER_ONNX_FILE},
+            )
+        except Exception as e:
+            print(f"ONNX reranker {RERANKER_ONNX_FILE} unavailable for {name} ({e}); using PyTorch.")
+    model = CrossEncoder(name, device=device, max_length=RERANK_MAX_LENGTH)
+    if device == "cuda":
+        # FP16 weights run the attention/MLP GEMMs on tensor cores at half the memory traffic.
+        model.model.half()
+    return model
+
+
+@functools.lru_cache(maxsize=None)
+def _rerank_batch_size(device: str) -> int:
+    if device != "cuda":
+        return RERANK_BATCH_SIZE
+    if torch.cuda.get_device_properties(0).total_memory <= SMALL_GPU_MEMORY:
+        return RERANK_SMALL_GPU_BATCH_SIZE
+    return RERANK_GPU_BATCH_SIZE
+
+
+def _has_onnx_backend() -> bool:
+    return all(importlib.util.find_spec(mod) is not None for mod in ("onnxruntime", "optimum"))
+
+
+@functools.lru_cache(maxsize=1)
+def _get_embeddings(api_key: str) -> OpenAIEmbeddings:
+    return OpenAIEmbeddings(api_key=api_key, model="text-embedding-3-small")
+
+
+def _get_vector_store(persist_dir: str, embeddings_model: OpenAIEmbeddings) -> Chroma:
+    store_key = f"http://{CHROMA_HOST}:{CHROMA_PORT}" if CHROMA_HOST else persist_dir
+    jira_vector_db = _vector_stores.get(store_key)
+    if jira_vector_db is None:
+        if CHROMA_HOST:
+            jira_vector_db = Chroma(
+                client=chromadb.HttpClient(host=CHROMA_HOST, port=CHROMA_PORT),
+                collection_name=CHROMA_COLLECTION,
+                embedding_function=embeddings_model,
+            )
+        else:
+            jira_vector_db = Chroma(
+                persist_directory=persist_dir,
+                embedding_function=embeddings_model,
+            )
+        _vector_stores[store_key] = jira_vector_db
+    return jira_vector_db
+
+
+# ==========================
+# Semantic query cache
+# ==========================
+
+class _SemanticCache:
+    """Fixed-size ring of (unit query embedding, result) pairs searched with one matrix product."""
+
+    def __init__(self, size: int, min_similarity: float) -> None:
+        self._size = size
+        self._min_similarity = min_similarity
+        self._vectors: Optional[np.ndarray] = None
+        self._entries: List[Optional[Tuple[Hashable, Dict[str, Any]]]] = [None] * size
+        self._next = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(embedding: np.ndarray) -> np.ndarray:
+        norm = float(np.linalg.norm(embedding))
+        return embedding / norm if norm else embedding
+
+    def get(self, params: Hashable, embedding: np.ndarray) -> Optional[Dict[str, Any]]:
+        q = self._normalize(embedding)
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != q.shape[0]:
+                return None
+            sims = self._vectors @ q
+            for idx in np.argsort(sims)[::-1]:
+                if sims[idx] < self._min_similarity:
+                    break
+                entry = self._entries[idx]
+                # Only results computed with the same store/k/threshold/model are interchangeable.
+                if entry is not None and entry[0] == params:
+                    return entry[1]
+        return None
+
+    def put(self, params: Hashable, embedding: np.ndarray, result: Dict[str, Any]) -> None:
+        q = self._normalize(embedding)
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != q.shape[0]:
+                self._vectors = np.zeros((self._size, q.shape[0]), dtype=np.float32)
+                self._entries = [None] * self._size
+                self._next = 0
+            self._vectors[self._next] = q
+            self._entries[self._next] = (params, result)
+            self._next = (self._next + 1) % self._size
+
+
+_semantic_cache = _SemanticCache(SEMANTIC_CACHE_SIZE, SEMANTIC_CACHE_MIN_SIMILARITY)
+
+
+# ==========================
+# Embedding batcher
+# ==========================
+
+class EmbeddingBatcher:
+    """Coalesces concurrent embed() calls into one embed_documents request per short window."""
+
+    def __init__(
+        self,
+        embeddings_model: OpenAIEmbeddings,
+        window: float = EMBED_BATCH_WINDOW,
+        max_batch: int = EMBED_MAX_BATCH,
+    ) -> None:
+        self._embeddings_model = embeddings_model
+        self._window = window
+        self._max_batch = max_batch
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # Keep references so in-flight batch tasks are not garbage collected.
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def embed(self, text: str) -> List[float]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self._max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self._window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._embed_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _embed_batch(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        try:
+            vectors = await self._embeddings_model.aembed_documents([text for text, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), vector in zip(batch, vectors):
+            # A caller that was cancelled while waiting has already resolved its future.
+            if not future.done():
+                future.set_result(vector)
+
+
+@functools.lru_cache(maxsize=1)
+def _get_embedding_batcher(api_key: str) -> EmbeddingBatcher:
+    return EmbeddingBatcher(_get_embeddings(api_key))
+
+
+def _openai_api_key() -> str:
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError(
+            "OpenAI API key not provided. Set OPENAI_API_KEY env var."
+        )
+    return api_key
+
 
 # ==========================
 # Reranking helpers
@@ -28,7 +252,7 @@ CHROMA_PERSIST_DIR = CURRENT_DIR.parent / "db" / "chroma" / "jira"
 def rerank_documents(
     query: str,
     documents: List[Document],
-    reranker_model_name: str = "cross-encoder/ms-marco-MiniLM-L-12-v2",
+    reranker_model_name: str = DEFAULT_RERANKER_MODEL,
 ) -> List[Tuple[Document, float]]:
     """
     Reranks a list of documents based on a query using a CrossEncoder model.
@@ -42,16 +266,19 @@ def rerank_documents(
         return []
 
     device = "cuda" if torch.cuda.is_available() else "cpu"
-    model = CrossEncoder(reranker_model_name, device=device)
-
-    sentence_pairs = [[query, doc.page_content] for doc in documents]
-    raw_scores = model.predict(sentence_pairs)  # unbounded logits
+    model = _get_cross_encoder(reranker_model_name, device)
+
+    sentence_pairs = [(query, doc.page_content[:RERANK_MAX_CHARS]) for doc in documents]
+    raw_scores = model.predict(  # unbounded logits
+        sentence_pairs,
+        batch_size=_rerank_batch_size(device),
+        convert_to_numpy=True,
+        show_progress_bar=False,
+    )
 
     # Convert raw logits → probability-like similarity [0, 1]
-    normalized_scores = [
-        torch.sigmoid(torch.tensor(s)).item()
-        for s in raw_scores
-    ]
+    raw = np.asarray(raw_scores, dtype=np.float32)
+    normalized_scores = (1.0 / (1.0 + np.exp(-raw))).tolist()
 
     doc_scores = sorted(
         zip(documents, normalized_scores),
@@ -61,19 +288,30 @@ def rerank_documents(
     return doc_scores
 
 
+def warm_reranker(reranker_model_name: str = DEFAULT_RERANKER_MODEL) -> None:
+    """
+    Load the reranker and run one tiny prediction so the first real query
+    doesn't pay weight loading, ONNX session setup or CUDA kernel warm-up.
+    """
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    model = _get_cross_encoder(reranker_model_name, device)
+    model.predict([("warm", "up")], show_progress_bar=False)
+
+
+# Metadata fields tried in order as a document's uniqueness key; prefer specific IDs.
+_DEDUPE_KEYS = ("issue_key", "jira_key", "issue_id", "source", "id")
+
+
 def _default_dedupe_key(doc: Document) -> Hashable:
     """
     Heuristic for determining a uniqueness key for a Document.
-    Adjust this to your metadata schema (e.g., 'issue_key', 'jira_key', 'issue_id').
+    Adjust _DEDUPE_KEYS to your metadata schema (e.g., 'issue_key', 'jira_key', 'issue_id').
     """
-    md = doc.metadata or {}
-    # Prefer specific IDs if they exist
-    for candidate_key in ("issue_key", "jira_key", "issue_id", "source", "id"):
-        if candidate_key in md:
-            return md[candidate_key]
-
+    md = doc.metadata
     # Fallback: page_content (can be long, but deterministic)
-    return doc.page_content
+    if not md:
+        return doc.page_content
+    return next((md[key] for key in _DEDUPE_KEYS if key in md), doc.page_content)
 
 
 def dedupe_reranked_documents(
@@ -84,14 +322,16 @@ def dedupe_reranked_documents(
     Remove duplicate documents from a reranked list while preserving order.
     """
     seen = set()
+    mark_seen = seen.add
     unique_results: List[Tuple[Document, float]] = []
+    keep = unique_results.append
 
     for doc, score in reranked:
         key = key_fn(doc)
         if key in seen:
             continue
-        seen.add(key)
-        unique_results.append((doc, score))
+        mark_seen(key)
+        keep((doc, score))
 
     return unique_results
 
@@ -105,13 +345,24 @@ def query_jira_rag(
     persist_dir: str = str(CHROMA_PERSIST_DIR),
     k: int = 10,
     similarity_threshold: float = 0.5,
-    reranker_model_name: str = "cross-encoder/ms-marco-MiniLM-L-12-v2",
+    reranker_model_name: str = DEFAULT_RERANKER_MODEL,
+    max_distance: float = 1.4,
+    query_embedding: Optional[Sequence[float]] = None,
+    verbose: bool = False,
 ) -> Optional[Dict[str, Any]]:
     """
     Queries the Chroma vector database, reranks the results, deduplicates them,
     filters by similarity threshold, and returns the best matching JIRA issue
     as a dict.
 
+    Candidates whose vector-store distance exceeds max_distance (Chroma's
+    squared L2 over unit embeddings, i.e. 2 - 2*cosine) are dropped before
+    reranking, so the cross-encoder only scores plausible matches.
+
+    Pass query_embedding when the query has already been embedded (see
+    aquery_jira_rag) to skip the embeddings call. verbose prints every
+    retrieved document and the best match.
+
     IMPORTANT:
       - Final fields (description, root_cause, fix_implemented, etc.) are taken
         DIRECTLY from the document metadata, which was injected at embed time
@@ -119,50 +370,59 @@ def query_jira_rag(
     """
     print(f"\nQuerying JIRA RAG with query: '{query_text}'")
 
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise ValueError(
-            "OpenAI API key not provided. Set OPENAI_API_KEY env var."
-        )
-
-    embeddings_model = OpenAIEmbeddings(api_key=api_key, model="text-embedding-3-small")
+    embeddings_model = _get_embeddings(_openai_api_key())
 
     # Load the Chroma database from the persistent directory
     persist_dir = str(persist_dir)
-    if not os.path.exists(persist_dir):
+    if not CHROMA_HOST and not os.path.exists(persist_dir):
         print(f"Chroma DB directory not found at {persist_dir}. Run create_rag.py first.")
         return None
 
     try:
-        jira_vector_db = Chroma(
-            persist_directory=persist_dir,
-            embedding_function=embeddings_model,
-        )
+        jira_vector_db = _get_vector_store(persist_dir, embeddings_model)
     except Exception as e:
         print(f"Error loading Chroma database from {persist_dir}: {e}")
         return None
 
-    # 1. Retrieve an initial set of documents from the vector store
-    retriever = jira_vector_db.as_retriever(search_kwargs={"k": k})
-    initial_retrieved_docs = retriever.invoke(query_text)
-    print(f"Initially retrieved {len(initial_retrieved_docs)} documents.")
-
-    if not initial_retrieved_docs:
-        return None
-
-    # 2. Apply reranking to these documents
-    reranked_docs_with_scores = rerank_documents(
-        query_text, initial_retrieved_docs, reranker_model_name
+    # 0. Embed once; near-duplicate queries are answered from the semantic cache
+    if query_embedding is None:
+        query_embedding = embeddings_model.embed_query(query_text)
+    query_embedding = np.asarray(query_embedding, dtype=np.float32)
+    cache_params = (persist_dir, k, similarity_threshold, reranker_model_name, max_distance)
+    cached = _semantic_cache.get(cache_params, query_embedding)
+    if cached is not None:
+        print("Semantic cache hit; returning cached best match.")
+        return dict(cached)
+
+    # 1. Retrieve an initial set of documents from the vector store and drop distant ones
+    docs_with_distances = jira_vector_db.similarity_search_by_vector_with_relevance_scores(
+        query_embedding.tolist(), k=k
+    )
+    nearby_docs_with_distances = [
+        (doc, distance) for doc, distance in docs_with_distances if distance <= max_distance
+    ]
+    print(
+        f"Initially retrieved {len(docs_with_distances)} documents, "
+        f"{len(nearby_docs_with_distances)} within distance {max_distance}."
     )
-    print(f"Reranked {len(reranked_docs_with_scores)} documents.")
 
-    # 3. De-duplicate based on metadata/content
-    unique_reranked_docs = dedupe_reranked_documents(reranked_docs_with_scores)
-    print(f"Deduped to {len(unique_reranked_docs)} unique documents.")
+    # 2. De-duplicate based on metadata/content before reranking, so chunks of the
+    #    same issue cost one cross-encoder pair (results arrive nearest first, so
+    #    the closest chunk of each issue is kept)
+    unique_retrieved_docs = [
+        doc for doc, _ in dedupe_reranked_documents(nearby_docs_with_distances)
+    ]
+    print(f"Deduped to {len(unique_retrieved_docs)} unique documents.")
 
-    if not unique_reranked_docs:
+    if not unique_retrieved_docs:
         return None
 
+    # 3. Apply reranking to these documents
+    unique_reranked_docs = rerank_documents(
+        query_text, unique_retrieved_docs, reranker_model_name
+    )
+    print(f"Reranked {len(unique_reranked_docs)} documents.")
+
     # 4. Filter the reranked documents based on a similarity threshold
     filtered_docs_with_scores = [
         (doc, score)
@@ -174,16 +434,17 @@ def query_jira_rag(
         f"above threshold {similarity_threshold} for query: '{query_text}'"
     )
 
-    if filtered_docs_with_scores:
+    if not filtered_docs_with_scores:
+        print("No relevant documents found after reranking and filtering.")
+        return None
+
+    if verbose:
         for i, (doc, score) in enumerate(filtered_docs_with_scores, start=1):
             print(f"\n--- Retrieved Document {i} (Score: {score:.4f}) ---")
             content = doc.page_content.replace("\n\n", "\n")
             print(f"{content}")
             if doc.metadata:
                 print(f"Metadata: {doc.metadata}")
-    else:
-        print("No relevant documents found after reranking and filtering.")
-        return None
 
     # 5. Take the top-1 best match
     best_doc, best_score = filtered_docs_with_scores[0]
@@ -199,12 +460,26 @@ def query_jira_rag(
         "fix_implemented": md.get("fix_implemented"),
     }
 
-    print("\n\n**********************")
-    print("Best matching issue (from metadata):")
-    print("**********************")
-    print(json.dumps(result, indent=4, ensure_ascii=False))
+    if verbose:
+        print("\n\n**********************")
+        print("Best matching issue (from metadata):")
+        print("**********************")
+        print(json.dumps(result, indent=4, ensure_ascii=False))
+
+    _semantic_cache.put(cache_params, query_embedding, result)
+    return dict(result)
 
-    return json.dumps(result, indent=4, ensure_ascii=False)
+
+async def aquery_jira_rag(query_text: str, **kwargs: Any) -> Optional[Dict[str, Any]]:
+    """
+    Async query_jira_rag for the agent: the query is embedded through the shared
+    EmbeddingBatcher, so concurrent queries share one OpenAI round trip, and the
+    blocking search/rerank runs in a worker thread.
+    """
+    query_embedding = await _get_embedding_batcher(_openai_api_key()).embed(query_text)
+    return await asyncio.to_thread(
+        query_jira_rag, query_text, query_embedding=query_embedding, **kwargs
+    )
 
 
 if __name__ == "__main__":
@@ -221,12 +496,13 @@ if __name__ == "__main__":
         k=10,
         similarity_threshold=0.5,
         reranker_model_name="cross-encoder/ms-marco-MiniLM-L-12-v2",
+        verbose=True,
     )
 
     if best_issue:
         print("\n\n**********************")
         print("Best matching issue (final result):")
         print("**********************")
-        print(best_issue)
+        print(json.dumps(best_issue, indent=4, ensure_ascii=False))
     else:
         print("No relevant JIRA issue found above threshold.")
@@ -214,15 +214,17 @@ export class App {
             createdAt: target.createdAt ?? Date.now(),
           };
           break;
-        case 'response-token':
+        case 'response-token': {
+          const incoming = event.tokens ?? [event.token ?? ''];
           nextMessage = {
             ...target,
             status: 'streaming',
             isStreaming: true,
-            tokens: [...(target.tokens ?? []), event.token ?? ''],
-            content: `${target.content ?? ''}${event.token ?? ''}`,
+            tokens: [...(target.tokens ?? []), ...incoming],
+            content: `${target.content ?? ''}${incoming.join('')}`,
           };
           break;
+        }
         case 'response-status':
           nextMessage = {
             ...target,
@@ -292,7 +294,7 @@ export class App {
       responseId: event.responseId,
       createdAt: Date.now(),
       content: event.content ?? '',
-      tokens: event.tokens ?? [],
+      tokens: [],
       status: initialStatus,
       isStreaming: initialStatus === 'thinking' || initialStatus === 'streaming',
       finished: false,
@@ -22,6 +22,7 @@ export class AiStreamService {
   private reconnectTimer?: ReturnType<typeof setTimeout>;
   private manualClose = false;
   private readonly reconnectDelayMs = 1500;
+  private readonly decoder = new TextDecoder();
 
   /** Emits stream events as they arrive from the backend. */
   readonly events$ = this.eventsSubject.asObservable();
@@ -45,9 +46,12 @@ export class AiStreamService {
 
     this.socket$ = webSocket<AgentStreamEvent | AgentSocketCommand>({
       url: environment.agentSocketUrl,
+      // The backend sends UTF-8 JSON as binary frames.
+      binaryType: 'arraybuffer',
       deserializer: (e) => {
         try {
-          return typeof e.data === 'string' ? JSON.parse(e.data) : e.data;
+          const data = e.data instanceof ArrayBuffer ? this.decoder.decode(e.data) : e.data;
+          return typeof data === 'string' ? JSON.parse(data) : data;
         } catch (error) {
           console.error('Failed to parse stream event', error);
           return null;